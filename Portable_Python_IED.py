@@ -1,20 +1,16 @@
-import ctypes
 import os
 import sys
 import subprocess
 import threading
-import shutil
 import re
-import io
-import importlib
-import platform
+import importlib.util
 import time
-import tempfile
 import json
-import datetime
-import ast
+import hashlib
+import html
 import logging
 import traceback
+from functools import lru_cache
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QFileDialog, QMessageBox, QVBoxLayout, 
@@ -22,8 +18,14 @@ from PyQt5.QtWidgets import (
     QProgressBar, QTabWidget, QSplitter, QStyleFactory, QInputDialog, 
     QSizePolicy, QTextEdit, QCheckBox
 )
-from PyQt5.QtCore import Qt, QRect, QSize, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QColor, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QPainter, QTextFormat
+from PyQt5.QtCore import Qt, QRect, QSize, QThread, QThreadPool, QRunnable, QProcess, pyqtSignal, QTimer
+from PyQt5.QtGui import QFont, QColor, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QPainter, QTextFormat, QTextDocument
+
+# Prefer the faster third-party 'regex' engine for syntax highlighting when it is available
+try:
+    import regex as _re
+except ImportError:
+    _re = re
 
 # Configure logging
 logging.basicConfig(
@@ -40,6 +42,71 @@ IMPORT_TO_PYPI = {
     # Add more mappings as needed
 }
 
+# Suggestions shown for NameErrors mentioning these names
+ERROR_SUGGESTIONS = {
+    "FirewallManagementTab": "Did you mean 'ServiceManagementTab'? Check if the class is defined or imported correctly.",
+    "SystemAdminToolkit": "Ensure 'SystemAdminToolkit' class is defined or imported in your script.",
+}
+# One alternation over all keys so each error line is scanned once
+ERROR_SUGGESTION_RE = re.compile("|".join(map(re.escape, ERROR_SUGGESTIONS)))
+
+# Run with 'python -c' to install PyInstaller only when it is missing and build in the same interpreter
+PYINSTALLER_BOOTSTRAP = (
+    "import importlib.util, subprocess, sys\n"
+    "if importlib.util.find_spec('PyInstaller') is None:\n"
+    "    print('Installing PyInstaller...', flush=True)\n"
+    "    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'pyinstaller', '--disable-pip-version-check'],\n"
+    "                          creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))\n"
+    "from PyInstaller.__main__ import run\n"
+    "run(sys.argv[1:])\n"
+)
+
+# Helper processes report through pipes; on Windows keep each from opening a console window of its own
+SUBPROCESS_CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+# Buffer size for writing scripts and requirements files; fewer write syscalls on slow USB drives
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Windows file attribute flags used to skip hidden and system entries
+FILE_ATTRIBUTE_HIDDEN = 0x2
+FILE_ATTRIBUTE_SYSTEM = 0x4
+
+# Window and output panel stylesheets per theme, built once at import time
+MODERN_MAIN_QSS = """
+    QMainWindow { background-color: #F5F5F5; color: #333333; }
+    QTabWidget::pane { border: 1px solid #CCCCCC; background-color: #FFFFFF; }
+    QTabBar::tab { background: #E0E0E0; color: #333333; padding: 10px; margin: 2px; }
+    QTabBar::tab:selected { background: #FFFFFF; border-bottom: 2px solid #0078D7; }
+    QPushButton { background-color: #0078D7; color: #FFFFFF; border: none; padding: 5px 10px; border-radius: 4px; }
+    QPushButton:hover { background-color: #005A9E; }
+    QLineEdit, QPlainTextEdit { background-color: #FFFFFF; color: #333333; border: 1px solid #CCCCCC; border-radius: 4px; }
+"""
+MODERN_PANEL_QSS = """
+    background-color: #FFFFFF;
+    color: #333333;
+    border: 1px solid #CCCCCC;
+    padding: 5px;
+"""
+DARK_MAIN_QSS = """
+    QMainWindow { background-color: #2B2B2B; color: #FFFFFF; }
+    QTabWidget::pane { border: 1px solid #444444; background-color: #3C3C3C; }
+    QTabBar::tab { background: #444444; color: #FFFFFF; padding: 10px; margin: 2px; }
+    QTabBar::tab:selected { background: #3C3C3C; border-bottom: 2px solid #6A6A6A; }
+    QPushButton { background-color: #555555; color: #FFFFFF; border: none; padding: 5px 10px; border-radius: 4px; }
+    QPushButton:hover { background-color: #666666; }
+    QLineEdit, QPlainTextEdit { background-color: #3C3C3C; color: #FFFFFF; border: 1px solid #444444; border-radius: 4px; }
+"""
+DARK_PANEL_QSS = """
+    background-color: #333333;
+    color: #FFFFFF;
+    border: 1px solid #444444;
+    padding: 5px;
+"""
+THEME_STYLESHEETS = {
+    "Modern": (MODERN_MAIN_QSS, MODERN_PANEL_QSS),
+    "Dark": (DARK_MAIN_QSS, DARK_PANEL_QSS),
+}
+
 # Helper functions
 def save_python_path(path):
     """Save the selected Python installation path to a JSON file in a fixed application directory."""
@@ -58,126 +125,381 @@ def load_python_path():
             return Path(data.get("python_path"))
     return None
 
-def is_hidden_or_system(filepath):
-    """Checks if a file or directory is hidden or a system file."""
-    if platform.system() != 'Windows':
+def is_hidden_or_system(filepath, attrs=None):
+    """
+    Checks if a file or directory is hidden or a system file. Callers that already hold the
+    Windows file attributes (e.g. from a directory listing) can pass them to skip the syscall.
+    """
+    if sys.platform != 'win32':
         return False  # Simplistic check for non-Windows systems
-    attrs = ctypes.windll.kernel32.GetFileAttributesW(str(filepath))
+    if attrs is None:
+        import ctypes  # Only needed on Windows
+        attrs = ctypes.windll.kernel32.GetFileAttributesW(str(filepath))
     if attrs == -1:
         return False
-    return bool(attrs & 2 or attrs & 4)
+    return (attrs & (FILE_ATTRIBUTE_HIDDEN | FILE_ATTRIBUTE_SYSTEM)) != 0
+
+@lru_cache(maxsize=32)
+def compile_search_pattern(search_term, match_case=False, whole_word=False):
+    """Compiles (and caches) a literal search pattern for the editor's search/replace options."""
+    pattern = re.escape(search_term)
+    if whole_word:
+        pattern = r'\b' + pattern + r'\b'
+    return re.compile(pattern, 0 if match_case else re.IGNORECASE)
+
+def read_process_batches(stream, chunk_size=65536, strip=True, max_pending=65536):
+    """
+    Yields lists of decoded lines from a binary process pipe, one list per read1() chunk, so worker
+    threads emit one signal per chunk without holding back output that has already arrived.
+    With strip=False only the line ending is removed, keeping a script's own spacing intact.
+    """
+    def decode(line):
+        return line.decode(errors='replace').strip() if strip else line.rstrip(b'\r').decode(errors='replace')
+
+    # Only each new chunk is split; the unfinished last line grows in place, so output without newlines
+    # (progress bars printed with end='\r') stays linear instead of rescanning the whole buffer every read
+    pending = bytearray()
+    while True:
+        chunk = stream.read1(chunk_size)
+        if not chunk:
+            break
+        lines = chunk.split(b'\n')
+        if len(lines) > 1:
+            pending += lines[0]
+            lines[0] = bytes(pending)
+            pending.clear()
+        pending += lines.pop()
+        if len(pending) >= max_pending:
+            lines.append(bytes(pending))  # Show an overlong line in pieces rather than holding it back
+            pending.clear()
+        if lines:
+            yield [decode(line) for line in lines]
+    if pending:
+        yield [decode(bytes(pending))]
+
+def read_process_lines(stream, chunk_size=65536):
+    """Yields decoded lines from a binary process pipe, reading in large chunks with read1()."""
+    for lines in read_process_batches(stream, chunk_size):
+        yield from lines
+
+def native_copytree(source, destination, on_output=None):
+    """
+    Copies a directory tree with the platform's native copy tool (robocopy on Windows, cp elsewhere),
+    falling back to shutil.copytree when the tool is unavailable. Output lines are passed to on_output.
+    Raises RuntimeError if the copy tool reports a failure.
+    """
+    import shutil  # Deferred with the other backup-only imports
+
+    if sys.platform == "win32" and shutil.which("robocopy"):
+        command = ["robocopy", source, destination, "/MT:32", "/E", "/NFL", "/NDL", "/NJH", "/NJS"]
+        max_success_code = 7  # robocopy uses 0-7 for success and 8+ for failures
+    elif sys.platform != "win32" and shutil.which("cp"):
+        os.makedirs(destination, exist_ok=True)
+        command = ["cp", "-a", os.path.join(source, "."), destination]
+        max_success_code = 0
+    else:
+        shutil.copytree(source, destination, dirs_exist_ok=True)
+        return
+
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=-1, creationflags=SUBPROCESS_CREATION_FLAGS
+    )
+    for line in read_process_lines(process.stdout):
+        if line and on_output:
+            on_output(line)
+    process.stdout.close()
+    returncode = process.wait()
+    if returncode > max_success_code:
+        raise RuntimeError(f"{command[0]} exited with code {returncode}")
+
+def fast_copy_file(source, destination):
+    """
+    Copies a file with its metadata using the kernel-side copy path: CopyFile2 on Windows, and
+    shutil.copy2 elsewhere, which already uses sendfile/fcopyfile on Linux and macOS.
+    """
+    import shutil
+
+    copy_file2 = None
+    if sys.platform == "win32":
+        import ctypes
+        copy_file2 = getattr(ctypes.windll.kernel32, "CopyFile2", None)
+    if copy_file2 is None:
+        shutil.copy2(source, destination)
+        return
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    result = copy_file2(str(source), str(destination), None)
+    if result != 0:
+        raise OSError(f"CopyFile2 failed with HRESULT {result & 0xFFFFFFFF:#010x}: {source}")
+    shutil.copystat(source, destination)
+
+def copy_backup_item(source, destination, is_dir):
+    """Copies one top-level backup item and returns the copy tool's output lines. Safe to run in a worker thread."""
+    output = []
+    if is_dir:
+        native_copytree(source, destination, on_output=output.append)
+    else:
+        fast_copy_file(source, destination)
+    return output
+
+def stop_process(process, timeout=2.0):
+    """
+    Asks a child process to terminate and waits for it, killing it if it is still running after timeout
+    seconds, so it no longer holds files open on the drive once this returns.
+    """
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def is_running_interpreter(python_executable):
+    """Checks whether python_executable is the interpreter running the IDE itself."""
+    try:
+        return bool(python_executable) and os.path.samefile(python_executable, sys.executable)
+    except OSError:
+        return False
+
+def list_installed_distributions():
+    """
+    Returns sorted (name, version) pairs for the distributions installed in the running interpreter,
+    read in-process with importlib.metadata instead of starting pip.
+    """
+    import importlib.metadata  # Deferred: pulls in email, zipfile and csv, ~20 ms at startup
+
+    distributions = {}
+    for distribution in importlib.metadata.distributions():
+        name = distribution.metadata['Name']
+        if name:
+            # The first match on sys.path wins, as it does for imports
+            distributions.setdefault(name.lower(), (name, distribution.version))
+    return sorted(distributions.values(), key=lambda item: item[0].lower())
+
+def pip_command(python_executable, *args):
+    """
+    Builds a 'python -m pip' command line. pip's check for a newer pip release is turned off: it reads a
+    state file, and every few days queries PyPI, on each run.
+    """
+    return [python_executable, "-m", "pip", *args, "--disable-pip-version-check"]
+
 def get_python_executable():
     # Dynamically locate the python executable on the drive
     drive_root = Path(sys.executable).drive  # Detects the current drive letter
     return str(Path(drive_root) / "PPython" / "python.exe")
 
-class InstallPackageThread(QThread):
-    progress_signal = pyqtSignal(str)
-    error_signal = pyqtSignal(str)
-    skip_signal = pyqtSignal(str)
+class TaskRunnable(QRunnable):
+    """Runs a callable on a QThreadPool worker so short tasks reuse threads instead of starting new ones."""
 
-    def __init__(self, package, python_executable):
+    def __init__(self, function, *args, on_error=None):
         super().__init__()
-        self.package = package
-        self.python_executable = python_executable
+        self.function = function
+        self.args = args
+        self.on_error = on_error
 
     def run(self):
+        # An exception escaping QRunnable.run would abort the whole application
         try:
-            self.progress_signal.emit(f"Attempting to install: {self.package}")
-            process = subprocess.Popen(
-                [self.python_executable, "-m", "pip", "install", self.package],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1  # Enable line-buffered output for real-time updates
-            )
+            self.function(*self.args)
+        except Exception:
+            error_message = f"Background task failed: {traceback.format_exc()}"
+            logging.error(error_message)
+            if self.on_error is not None:
+                self.on_error(error_message)
 
-            # Read output line-by-line for real-time updates
-            for line in iter(process.stdout.readline, ''):
-                if line:
-                    self.progress_signal.emit(line.strip())
-                    QApplication.processEvents()  # Force UI to update
 
-            process.stdout.close()
-            process.wait()
+class PipCommandThread(QThread):
+    """Runs a single pip command and streams its combined output through signals."""
+    progress_signal = pyqtSignal(str)
+    error_signal = pyqtSignal(str)
+    skip_signal = pyqtSignal(str)
+    completed_signal = pyqtSignal(int)
+
+    def __init__(self, argv, description, retry_commands=None):
+        super().__init__()
+        self.argv = argv
+        self.description = description
+        # (argv, description) pairs run one at a time if argv fails, so one bad package does not block the rest
+        self.retry_commands = retry_commands or []
+        self.process = None
+        self.cancelled = False
+        self.errors = []
 
-            # Capture any error messages after completion
-            stderr_output = process.stderr.read()
-            if process.returncode == 0:
-                self.progress_signal.emit(f"Successfully installed: {self.package}")
+    def run(self):
+        returncode = -1
+        failed_description = self.description
+        try:
+            self.progress_signal.emit(f"Attempting to {self.description}")
+            returncode = self.run_pip(self.argv)
+
+            if returncode != 0 and self.retry_commands and not self.cancelled:
+                self.progress_signal.emit(f"Failed to {self.description}; retrying one package at a time...")
+                failed = []
+                for argv, description in self.retry_commands:
+                    if self.cancelled:
+                        break
+                    self.progress_signal.emit(f"Attempting to {description}")
+                    if self.run_pip(argv) != 0:
+                        failed.append(description)
+                returncode = 1 if failed or self.cancelled else 0
+                failed_description = "; ".join(failed) or self.description
+
+            if returncode == 0:
+                self.progress_signal.emit(f"Finished: {self.description}")
             else:
-                self.skip_signal.emit(f"Skipping installation of {self.package}: {stderr_output.strip()}")
-            process.stderr.close()
+                details = "\n".join(self.errors) or f"pip exited with code {returncode}"
+                self.skip_signal.emit(f"Failed to {failed_description}: {details}")
 
         except Exception as e:
-            self.skip_signal.emit(f"Unexpected error installing {self.package}: {str(e)}")
+            self.error_signal.emit(f"Unexpected error while trying to {self.description}: {str(e)}")
+        finally:
+            self.completed_signal.emit(returncode)
+
+    def run_pip(self, argv):
+        """Runs one pip command, streaming its parsed output, and returns the exit code."""
+        if self.cancelled:
+            return -1
+        self.process = process = subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=-1,  # Block buffering; output is split into lines as chunks arrive
+            creationflags=SUBPROCESS_CREATION_FLAGS
+        )
+        if self.cancelled:
+            stop_process(process)  # cancel() ran while the process was starting and could not see it yet
+
+        # Read output in chunks; the queued signal updates the UI from the main thread
+        for lines in read_process_batches(process.stdout):
+            messages = list(self.parse_pip_output(lines))
+            if messages:
+                self.progress_signal.emit("\n".join(messages))
+        process.stdout.close()
+        return process.wait()
+
+    def parse_pip_output(self, lines):
+        """Passes pip output through, turning its summary lines into per-package progress messages."""
+        for line in lines:
+            if not line:
+                continue
+            if line.startswith("Collecting "):
+                yield f"Attempting to install: {line[len('Collecting '):]}"
+            elif line.startswith("Successfully installed "):
+                for package in line.split()[2:]:
+                    yield f"Successfully installed: {package}"
+            else:
+                if line.startswith("ERROR:"):
+                    self.errors.append(line)
+                yield line
 
+    def cancel(self):
+        """Terminates the pip process if it is still running and waits for it to exit."""
+        self.cancelled = True
+        if self.process and self.process.poll() is None:
+            stop_process(self.process)
 
-class InstallRequirementsThread(QThread):
-    progress_signal = pyqtSignal(str)
+
+class BackupThread(QThread):
+    """Copies the USB drive contents (except 'PPython') to a backup folder and exports requirements.txt."""
+    log_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
-    skip_signal = pyqtSignal(str)
 
-    def __init__(self, requirements_path, python_executable):
+    def __init__(self, usb_drive, backup_folder, python_executable):
         super().__init__()
-        self.requirements_path = requirements_path
+        self.usb_drive = usb_drive
+        self.backup_folder = backup_folder
         self.python_executable = python_executable
 
     def run(self):
         try:
-            with open(self.requirements_path, 'r') as file:
-                packages = file.read().splitlines()
-
-            for package in packages:
-                self.progress_signal.emit(f"Attempting to install: {package}")
-
-                process = subprocess.Popen(
-                    [self.python_executable, "-m", "pip", "install", package],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True  # Ensures real-time text output
-                )
-
-                # Read and display output line-by-line
-                while True:
-                    line = process.stdout.readline()
-                    if not line:
-                        break
-                    self.progress_signal.emit(line.strip())
-                    QApplication.processEvents()  # Update UI for each output line
+            # DirEntry objects carry the type information from the directory listing itself
+            copy_jobs = []
+            with os.scandir(self.usb_drive) as entries:
+                for entry in entries:
+                    item = entry.name
+                    if item.lower() == "ppython":
+                        self.log_signal.emit(f"Skipped 'PPython' folder: {item}")
+                        continue
+
+                    source = entry.path
+                    destination = os.path.join(self.backup_folder, item)
+
+                    # On Windows the listing already holds the file attributes, so no extra syscall is made
+                    attrs = entry.stat(follow_symlinks=False).st_file_attributes if sys.platform == "win32" else None
+                    if is_hidden_or_system(source, attrs):
+                        self.log_signal.emit(f"Skipped hidden or system file/folder: {item}")
+                        continue
+
+                    copy_jobs.append((item, source, destination, entry.is_dir()))
+
+            # Copy top-level items concurrently; results are reported as each copy finishes
+            from concurrent.futures import ThreadPoolExecutor, as_completed
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = {
+                    executor.submit(copy_backup_item, source, destination, is_dir): item
+                    for item, source, destination, is_dir in copy_jobs
+                }
+                for future in as_completed(futures):
+                    item = futures[future]
+                    try:
+                        for line in future.result():
+                            self.log_signal.emit(line)
+                        self.log_signal.emit(f"Backed up {item} successfully.")
+                    except Exception as copy_error:
+                        self.log_signal.emit(f"Failed to back up {item}: {copy_error}")
+                        self.error_signal.emit(f"Failed to back up {item}: {copy_error}")
 
-                # Handle errors after each package installation attempt
-                stderr_output = process.stderr.read()
-                if process.returncode == 0:
-                    self.progress_signal.emit(f"Successfully installed: {package}")
+            # Export requirements.txt
+            self.log_signal.emit("Exporting requirements.txt...")
+            try:
+                requirements_path = os.path.join(self.backup_folder, "requirements.txt")
+                if is_running_interpreter(self.python_executable):
+                    # Same interpreter: read the installed versions directly instead of starting pip
+                    with open(requirements_path, 'w', buffering=WRITE_BUFFER_SIZE) as req_file:
+                        req_file.writelines(f"{name}=={version}\n" for name, version in list_installed_distributions())
                 else:
-                    self.skip_signal.emit(f"Failed to install {package}: {stderr_output.strip()}")
-                process.stderr.close()
-
-        except Exception as e:
-            self.error_signal.emit(f"Error reading {self.requirements_path}: {str(e)}")
+                    # Let pip write straight into the file instead of capturing its output in memory
+                    list_command = pip_command(self.python_executable, "freeze")
+                    with open(requirements_path, 'wb', buffering=WRITE_BUFFER_SIZE) as req_file:
+                        subprocess.run(list_command, stdout=req_file, stderr=subprocess.PIPE, check=True, creationflags=SUBPROCESS_CREATION_FLAGS)
+                self.log_signal.emit(f"requirements.txt exported to {requirements_path}")
+            except subprocess.CalledProcessError as e:
+                stderr_output = e.stderr.decode(errors='replace')
+                self.log_signal.emit("Failed to export requirements.txt.")
+                self.log_signal.emit(stderr_output)
+                self.error_signal.emit(f"Failed to export requirements.txt: {stderr_output}")
 
+            self.log_signal.emit("Backup completed successfully.")
 
+        except Exception:
+            error_message = f"Backup failed: {traceback.format_exc()}"
+            self.log_signal.emit(error_message)
+            self.error_signal.emit(error_message)
 
 
 class PythonHighlighter(QSyntaxHighlighter):
+    # Foreground colors per theme; themes not listed use the default palette
+    THEME_COLORS = {
+        'Dark': {'keyword': "#569CD6", 'comment': "#6A9955", 'string': "#CE9178"},
+    }
+    DEFAULT_COLORS = {'keyword': "blue", 'comment': "green", 'string': "orange"}
+    TRIPLE_QUOTES = ('"""', "'''")
+
     def __init__(self, parent=None, theme='Modern'):
         super().__init__(parent)
-        self.theme = theme
-        self.highlighting_rules = []
+        self.theme = None
+        # Comment and string rules as parallel lists of patterns and their formats, applied in order
+        self._patterns = []
+        self._formats = []
 
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("blue"))
+        self.keyword_format = keyword_format = QTextCharFormat()
         keyword_format.setFontWeight(QFont.Bold)
 
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("green"))
+        self.comment_format = comment_format = QTextCharFormat()
         comment_format.setFontItalic(True)
 
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("orange"))
+        self.string_format = string_format = QTextCharFormat()
+        self.set_theme(theme)
 
         keywords = [
             "if", "else", "elif", "for", "while", "break", "continue", "return",
@@ -187,19 +509,95 @@ class PythonHighlighter(QSyntaxHighlighter):
             "True", "False", "None"
         ]
 
-        for word in keywords:
-            pattern = r'\b' + re.escape(word) + r'\b'
-            self.highlighting_rules.append((re.compile(pattern), keyword_format))
+        # One alternation for all keywords so each block is scanned once instead of per keyword.
+        # Keywords are applied last and only outside comments and strings, which would paint over them
+        self._keyword_re = _re.compile(r'\b(?:' + '|'.join(map(re.escape, keywords)) + r')\b')
 
-        self.highlighting_rules.append((re.compile(r"#.*"), comment_format))
-        self.highlighting_rules.append((re.compile(r'\".*?\"'), string_format))
-        self.highlighting_rules.append((re.compile(r"\'.*?\'"), string_format))
+        self._patterns.append(_re.compile(r"#.*"))
+        self._formats.append(comment_format)
+        # Single pass for both quote styles, honouring backslash escapes
+        self._patterns.append(_re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|\'[^\'\\]*(?:\\.[^\'\\]*)*\''))
+        self._formats.append(string_format)
+
+        # Triple quotes open and close multi-line strings tracked through the block state. Single-line
+        # strings and comments are matched too, so quotes inside them are skipped rather than opening a string
+        self._string_scan_re = _re.compile(
+            r'"""|\'\'\'|"[^"\\]*(?:\\.[^"\\]*)*"|\'[^\'\\]*(?:\\.[^\'\\]*)*\'|#'
+        )
+
+    def set_theme(self, theme):
+        """
+        Updates the format colors in place. Returns True if the colors changed and the
+        document needs to be rehighlighted.
+        """
+        old_colors = self.THEME_COLORS.get(self.theme, self.DEFAULT_COLORS)
+        colors = self.THEME_COLORS.get(theme, self.DEFAULT_COLORS)
+        first_call = self.theme is None
+        self.theme = theme
+        if not first_call and colors == old_colors:
+            return False
+
+        self.keyword_format.setForeground(QColor(colors['keyword']))
+        self.comment_format.setForeground(QColor(colors['comment']))
+        self.string_format.setForeground(QColor(colors['string']))
+        return True
 
     def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, fmt)
+        # Block state: 0 = normal code, otherwise the index+1 of the open triple quote delimiter
+        state = self.previousBlockState()
+        delimiter = self.TRIPLE_QUOTES[state - 1] if state in (1, 2) else None
+        start = 0
+
+        if delimiter:
+            end = text.find(delimiter)
+            if end == -1:
+                # The whole block sits inside a multi-line string; no other rule applies
+                self.setFormat(0, len(text), self.string_format)
+                self.setCurrentBlockState(state)
+                return
+            start = end + 3
+
+        # Rules are applied in order, so strings override comments. Their spans are kept to skip keywords
+        spans = []
+        for pattern, format in zip(self._patterns, self._formats):
+            for match in pattern.finditer(text, start):
+                match_start, match_end = match.span()
+                self.setFormat(match_start, match_end - match_start, format)
+                spans.append((match_start, match_end))
+
+        code_start = start
+        if start:
+            self.setFormat(0, start, self.string_format)
+
+        self.setCurrentBlockState(0)
+        while True:
+            match = self._string_scan_re.search(text, start)
+            if not match or match.group() == '#':
+                break  # Nothing after a comment sign can open a string
+            if match.group() not in self.TRIPLE_QUOTES:
+                start = match.end()  # A complete single-line string
+                continue
+            opening = match.start()
+            close = text.find(match.group(), opening + 3)
+            if close == -1:
+                self.setFormat(opening, len(text) - opening, self.string_format)
+                self.setCurrentBlockState(self.TRIPLE_QUOTES.index(match.group()) + 1)
+                spans.append((opening, len(text)))
+                break
+            start = close + 3
+            self.setFormat(opening, start - opening, self.string_format)
+            spans.append((opening, start))
+
+        # Keywords and spans are both walked left to right; a keyword never straddles a span boundary
+        spans.sort()
+        span_index = 0
+        for match in self._keyword_re.finditer(text, code_start):
+            match_start, match_end = match.span()
+            while span_index < len(spans) and spans[span_index][1] <= match_start:
+                span_index += 1
+            if span_index < len(spans) and spans[span_index][0] <= match_start:
+                continue
+            self.setFormat(match_start, match_end - match_start, self.keyword_format)
 
 class LineNumberArea(QWidget):
     def __init__(self, editor):
@@ -213,11 +611,22 @@ class LineNumberArea(QWidget):
         self.code_editor.line_number_area_paint_event(event)
 
 class DebugConsole(QPlainTextEdit):
+    command_submitted = pyqtSignal(str)  # Emitted with the typed command when Enter is pressed
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setReadOnly(False)  # Allow user input for debugger commands
         self.setFont(QFont("Consolas", 10))
-        self.setPlaceholderText("Enter debugger commands here (e.g., 'n' for next, 'c' for continue)")
+        self.setPlaceholderText("Enter debugger commands here and press Enter (e.g., 'n' for next, 'c' for continue)")
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter) and not event.modifiers() & Qt.ShiftModifier:
+            command = self.toPlainText().strip()
+            if command:
+                self.command_submitted.emit(command)
+                self.clear()
+            return
+        super().keyPressEvent(event)
 
 class CodeEditor(QPlainTextEdit):
     def __init__(self, parent=None, font_size=12, theme='Modern'):
@@ -227,6 +636,11 @@ class CodeEditor(QPlainTextEdit):
         self.theme = theme
         self.line_number_area = LineNumberArea(self)
 
+        # Cached inputs for line_number_area_width, refreshed on block count or font changes
+        self._digit_width = self.fontMetrics().horizontalAdvance('9')
+        self._cached_block_digits = 1
+        self._lineno_cache = ['1']  # Line number labels, grown on demand while painting
+
         # Set tab width to 4 spaces
         tab_width = 4 * self.fontMetrics().horizontalAdvance(' ')
         self.setTabStopDistance(tab_width)
@@ -236,6 +650,12 @@ class CodeEditor(QPlainTextEdit):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         
+        # Coalesce bursts of cursor movement (e.g. key repeat) into one line highlight per frame
+        self._hl_timer = QTimer(self)
+        self._hl_timer.setSingleShot(True)
+        self._hl_timer.setInterval(16)
+        self._hl_timer.timeout.connect(self._do_highlight_current_line)
+
         # Connect signals for line numbers and highlighting
         self.blockCountChanged.connect(self.update_line_number_area_width)
         self.updateRequest.connect(self.update_line_number_area)
@@ -243,9 +663,8 @@ class CodeEditor(QPlainTextEdit):
 
         # Initial setup for line numbers and highlighting
         self.update_line_number_area_width(0)
-        self.highlight_current_line()
-
-        self.current_search_pos = 0  # Initialize search position tracker
+        self._search_selections = []  # Extra selections marking search matches
+        self._do_highlight_current_line()
 
     def set_theme(self, theme):
         self.theme = theme
@@ -260,7 +679,19 @@ class CodeEditor(QPlainTextEdit):
             """)
         else:
             self.setStyleSheet("background-color: #FFFFFF; color: #000000;")
-        self.highlighter = PythonHighlighter(self.document(), theme)
+        if self.highlighter.set_theme(theme):
+            # Rehighlight after the stylesheet has been applied rather than blocking this call
+            QTimer.singleShot(0, self.highlighter.rehighlight)
+        self._update_digit_width()
+
+    def setFont(self, font):
+        super().setFont(font)
+        if hasattr(self, '_digit_width'):
+            self._update_digit_width()
+
+    def _update_digit_width(self):
+        self._digit_width = self.fontMetrics().horizontalAdvance('9')
+        self.update_line_number_area_width(0)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Tab:
@@ -271,11 +702,14 @@ class CodeEditor(QPlainTextEdit):
             super().keyPressEvent(event)
 
     def line_number_area_width(self):
-        digits = len(str(max(1, self.blockCount())))
-        space = 3 + self.fontMetrics().horizontalAdvance('9') * digits
-        return space
+        return 3 + self._digit_width * self._cached_block_digits
 
     def update_line_number_area_width(self, _):
+        block_count = max(1, self.blockCount())
+        self._cached_block_digits = len(str(block_count))
+        # Keep the label cache monotonic unless the document shrank dramatically
+        if len(self._lineno_cache) > 1000 and block_count * 4 < len(self._lineno_cache):
+            del self._lineno_cache[block_count:]
         self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
 
     def update_line_number_area(self, rect, dy):
@@ -288,6 +722,9 @@ class CodeEditor(QPlainTextEdit):
             self.update_line_number_area_width(0)
 
     def highlight_current_line(self):
+        self._hl_timer.start()
+
+    def _do_highlight_current_line(self):
         extra_selections = []
         if not self.isReadOnly():
             selection = QTextEdit.ExtraSelection()
@@ -297,7 +734,7 @@ class CodeEditor(QPlainTextEdit):
             selection.cursor = self.textCursor()
             selection.cursor.clearSelection()
             extra_selections.append(selection)
-        self.setExtraSelections(extra_selections)
+        self.setExtraSelections(extra_selections + self._search_selections)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -318,7 +755,11 @@ class CodeEditor(QPlainTextEdit):
 
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
-                number = str(block_number + 1)
+                if block_number >= len(self._lineno_cache):
+                    self._lineno_cache.extend(
+                        [str(n) for n in range(len(self._lineno_cache) + 1, block_number + 65)]
+                    )
+                number = self._lineno_cache[block_number]
                 if self.theme == "Dark":
                     painter.setPen(Qt.white)
                 else:
@@ -333,70 +774,54 @@ class CodeEditor(QPlainTextEdit):
 
     def clear_highlights(self):
         """
-        Clears any existing highlights in the document by resetting formats.
+        Clears any existing search highlights. They are extra selections rather than character
+        formats, so the document, its layout and its undo history are left untouched.
         """
         try:
-            cursor = QTextCursor(self.document())
-            format_clear = QTextCharFormat()  # Default formatting with no background
-            cursor.setPosition(0)  # Move cursor to the start of the document
-            cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
-            cursor.setCharFormat(format_clear)
+            self._search_selections = []
+            self._do_highlight_current_line()
         except Exception as e:
             print(f"Error clearing highlights: {e}")
 
-    def search_text(self, search_term):
+    def search_text(self, search_term, match_case=False, whole_word=False):
         """
-        Searches for the next occurrence of the search term in the editor, highlights it,
-        and scrolls to its position. Resets to the top if no more matches are found.
+        Searches for the next occurrence of the search term after the cursor, highlights it,
+        and scrolls to its position. Wraps around to the top if no more matches are found.
         """
         try:
-            # Clear existing highlights
-            self.clear_highlights()
+            if not search_term:
+                return False
 
-            # Document text to be searched
-            document_text = self.toPlainText()
-            
-            # Compile the regex pattern
-            regex_pattern = re.compile(re.escape(search_term), re.IGNORECASE)
-            
-            # Find the next match starting from the current search position
-            match = regex_pattern.search(document_text, self.current_search_pos)
-            
-            # If a match is found, highlight and scroll to it
-            if match:
-                start_pos, end_pos = match.span()
+            flags = QTextDocument.FindFlags()
+            if match_case:
+                flags |= QTextDocument.FindCaseSensitively
+            if whole_word:
+                flags |= QTextDocument.FindWholeWords
 
-                # Create cursor for match and set formatting
-                cursor = QTextCursor(self.document())
-                cursor.setPosition(start_pos)
-                cursor.setPosition(end_pos, QTextCursor.KeepAnchor)
+            # Let Qt walk its own text storage from the cursor; the cursor itself is the search position
+            cursor = self.document().find(search_term, self.textCursor(), flags)
+            if cursor.isNull():
+                cursor = self.document().find(search_term, 0, flags)
 
-                # Highlight formatting
-                highlight_format = QTextCharFormat()
-                highlight_format.setBackground(QColor("yellow"))
-                cursor.setCharFormat(highlight_format)
+            # If a match is found, highlight and scroll to it
+            if not cursor.isNull():
+                selection = QTextEdit.ExtraSelection()
+                selection.format.setBackground(QColor("yellow"))
+                selection.cursor = QTextCursor(cursor)
+                self._search_selections = [selection]
 
-                # Move to the found match
+                # Move to the found match; the next search continues after this selection
                 self.setTextCursor(cursor)
                 self.ensureCursorVisible()
-
-                # Update current_search_pos to continue from the end of this match
-                self.current_search_pos = end_pos
+                self._do_highlight_current_line()
                 return True  # Indicates a match was found
 
-            # If no match found from current position, wrap around and start from the top
-            elif self.current_search_pos > 0:
-                # Reset search position to start of document and try again
-                self.current_search_pos = 0
-                return self.search_text(search_term)  # Recursive call to search from the top
-
-            # If no match found at all, show message and reset position
-            else:
-                QMessageBox.information(self, "Search", f"'{search_term}' not found.")
-                return False  # Indicates no match found
+            self.clear_highlights()
+            return False  # Indicates no match found
 
         except Exception as e:
             print(f"Error during search: {e}")
+            return False
 
     def replace_text(self, search_term, replace_text):
         """
@@ -409,21 +834,35 @@ class CodeEditor(QPlainTextEdit):
             return True
         return False
 
-    def replace_all(self, search_term, replace_text):
+    def replace_all(self, search_term, replace_text, match_case=False, whole_word=False):
         """
         Replaces all occurrences of search_term with replace_text, respecting match case and whole word options.
+        Returns the number of replacements made.
         """
-        cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.Start)
-        self.setTextCursor(cursor)
-        
-        while self.search_text(search_term):
-            self.replace_text(search_term, replace_text)
+        if not search_term:
+            return 0
+
+        regex_pattern = compile_search_pattern(search_term, match_case, whole_word)
+
+        # Substitute in a single pass; the lambda keeps backslashes in replace_text literal
+        new_text, count = regex_pattern.subn(lambda match: replace_text, self.toPlainText())
+        if count:
+            # Swap the document contents inside one edit block so undo reverts it in one step
+            cursor = QTextCursor(self.document())
+            cursor.beginEditBlock()
+            cursor.select(QTextCursor.Document)
+            cursor.insertText(new_text)
+            cursor.endEditBlock()
+        return count
 
 class OutputPanel(QPlainTextEdit):
+    DEFAULT_SCROLLBACK = 5000  # Maximum number of lines kept; the oldest lines are dropped first
+
     def __init__(self, parent=None, bg_color="white", text_color="black"):
         super().__init__(parent)
         self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)  # Appended output would otherwise be kept again on the undo stack
+        self.set_scrollback(self.DEFAULT_SCROLLBACK)
         self.setStyleSheet(f"background-color: {bg_color}; color: {text_color};")
         self.setFont(QFont("Consolas", 10))
         self.setLineWrapMode(QPlainTextEdit.NoWrap)
@@ -436,43 +875,19 @@ class OutputPanel(QPlainTextEdit):
 
     def flush(self):
         pass
+
+    def set_scrollback(self, lines):
+        """Caps the panel at the given number of lines (0 for unlimited); older output is discarded."""
+        self.setMaximumBlockCount(lines)
 def redirect_output(self):
     sys.stdout = self.output_panel
     sys.stderr = self.output_panel
     
-class InstallThread(QThread):
-    package_installed_signal = pyqtSignal(str)
-    error_signal = pyqtSignal(str)
-
-    def __init__(self, python_executable, package_name):
-        super().__init__()
-        self.python_executable = python_executable
-        self.package_name = package_name
-
-    def run(self):
-        install_command = [self.python_executable, "-m", "pip", "install", self.package_name]
-        try:
-            process = subprocess.Popen(
-                install_command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-
-            for line in process.stdout:
-                self.package_installed_signal.emit(line.strip())
-            for line in process.stderr:
-                self.error_signal.emit(line.strip())
-                
-            process.stdout.close()
-            process.stderr.close()
-            process.wait()
-        except Exception as e:
-            self.error_signal.emit(f"Error installing {self.package_name}: {str(e)}")
-
-
-    
 class MainWindow(QMainWindow):
+    output_line_signal = pyqtSignal(str, bool)  # (text, is_error) from background reader threads
+    package_output_signal = pyqtSignal(str)  # Text for the package maintenance panel from background threads
+    output_html_signal = pyqtSignal(str)  # Rich text for the output panel from background threads
+
     def __init__(self):
         super(MainWindow, self).__init__()
         self.theme = "Modern"
@@ -484,13 +899,36 @@ class MainWindow(QMainWindow):
         self.skipped_packages = []
         self.project_scripts_folder = None
         self.install_threads = []  # Initialize install_threads
+        self.install_threads_lock = threading.Lock()  # Threads are added from pool threads and pruned on the GUI thread
+        self.installed_packages_cache = set()  # Import names already found to be installed
+        self.imports_cache = (None, [])  # (code, packages) from the last successful import scan
+        self._last_checked_code_hash = None  # Digest of the code last passed to check_and_install_missing_packages
+        self.installed_distributions_cache = None  # Lower-cased distribution names; None until read
+        self.requirements_cache = None  # Encoded requirements.txt contents for the top-level packages
+        self.error_log_file = None  # Kept open between errors; flushed periodically and on exit
+        self.error_log_path = None
+        self.error_log_lock = threading.Lock()
+        self.scratch_script_paths = {}  # Per-window scratch files by purpose; created on first use, removed on exit
+        self.thread_pool = QThreadPool.globalInstance()
+        # Run Code holds a worker for as long as the script runs; keep room for package tasks
+        self.thread_pool.setMaxThreadCount(max(4, self.thread_pool.maxThreadCount()))
         self.init_ui_structure()
+        self.output_line_signal.connect(self.update_output_panel)
+        self.package_output_signal.connect(self.handle_progress_output)
+        self.output_html_signal.connect(self.update_output_panel_html)
         self.select_python_folder()  # Select Python installation during initialization
         self.active_thread = None  # Reference to the active thread
         self.active_process = None  # Reference to the active subprocess
-        self.command_in_progress = False
+        self.debug_process = None  # QProcess running the current pdb session
+        self.debug_output_buffer = b''  # pdb output not yet shown in the output panel
+        self.debug_flush_timer = QTimer(self)  # Shows program output that arrives without a pdb prompt after it
+        self.debug_flush_timer.setSingleShot(True)
+        self.debug_flush_timer.setInterval(50)
+        self.debug_flush_timer.timeout.connect(self.flush_debug_output)
+        self.debug_console.command_submitted.connect(self.send_debug_command)
         self.setup_auto_save()
         self.init_auto_save_timer()
+        self.init_error_log_timer()
 
     def init_ui_structure(self):
         self.setWindowTitle("Portable Python IDE")
@@ -530,6 +968,11 @@ class MainWindow(QMainWindow):
         self.auto_save_interval = 300000  # 5 minutes in milliseconds
         self.auto_save_timer.start(self.auto_save_interval)
 
+    def init_error_log_timer(self):
+        self.error_log_flush_timer = QTimer(self)
+        self.error_log_flush_timer.timeout.connect(self.flush_error_log)
+        self.error_log_flush_timer.start(2000)  # Flush buffered error log entries every 2 seconds
+
     def setup_auto_save(self):
         # Set up the auto-save timer to save the code every 5 minutes (300,000 ms)
         self.auto_save_timer = QTimer(self)
@@ -544,7 +987,7 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'current_file_path') and self.current_file_path:
             # Save directly to the open file
             try:
-                with open(self.current_file_path, 'w') as file:
+                with open(self.current_file_path, 'w', buffering=WRITE_BUFFER_SIZE) as file:
                     file.write(code)
                 self.output_panel.appendPlainText(f"Auto-saved to {self.current_file_path}")
             except Exception as e:
@@ -553,11 +996,11 @@ class MainWindow(QMainWindow):
             # Save to a unique auto-save file in the AutoSave folder
             auto_save_folder = os.path.join(self.usb_drive, "PPython", "AutoSave") if self.usb_drive else "AutoSave"
             os.makedirs(auto_save_folder, exist_ok=True)
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
             auto_save_path = os.path.join(auto_save_folder, f"auto_save_script_{timestamp}.pyw")
             
             try:
-                with open(auto_save_path, 'w') as file:
+                with open(auto_save_path, 'w', buffering=WRITE_BUFFER_SIZE) as file:
                     file.write(code)
                 self.output_panel.appendPlainText(f"Auto-saved to backup file {auto_save_path}")
             except Exception as e:
@@ -775,22 +1218,46 @@ class MainWindow(QMainWindow):
         full_message = f"[{timestamp}] {error_message}\n"
 
         try:
-            with open(log_path, "a") as log_file:
-                log_file.write(full_message)
-
-            if panel == 'package':
-                self.package_output_panel.appendPlainText("An error occurred. Check the error log for details.")
-            elif panel == 'editor':
-                self.output_panel.appendPlainText("An error occurred. Check the error log for details.")
+            with self.error_log_lock:
+                # Reopen only when the log location changes (e.g. a different USB drive was selected)
+                if self.error_log_file is None or self.error_log_path != log_path:
+                    if self.error_log_file is not None:
+                        self.error_log_file.close()
+                    self.error_log_file = open(log_path, "a", buffering=1 << 16)
+                    self.error_log_path = log_path
+                self.error_log_file.write(full_message)
+
+            # Panel notices go through the queued signals since worker threads log errors too
+            if panel == 'editor':
+                self.output_line_signal.emit("An error occurred. Check the error log for details.", False)
             else:
-                # Default to package panel if an unknown panel is specified
-                self.package_output_panel.appendPlainText("An error occurred. Check the error log for details.")
+                # The package panel is also the default if an unknown panel is specified
+                self.package_output_signal.emit("An error occurred. Check the error log for details.")
         except Exception as log_error:
             # Append the logging failure to the specified panel or default to package panel
             if panel == 'editor':
-                self.output_panel.appendPlainText(f"Failed to write to error log: {log_error}")
+                self.output_line_signal.emit(f"Failed to write to error log: {log_error}", False)
             else:
-                self.package_output_panel.appendPlainText(f"Failed to write to error log: {log_error}")
+                self.package_output_signal.emit(f"Failed to write to error log: {log_error}")
+
+    def flush_error_log(self):
+        """Writes any buffered error log entries to disk."""
+        with self.error_log_lock:
+            if self.error_log_file is not None:
+                try:
+                    self.error_log_file.flush()
+                except Exception as e:
+                    print(f"Error flushing error log: {e}")
+
+    def close_error_log(self):
+        """Flushes and closes the error log file."""
+        with self.error_log_lock:
+            if self.error_log_file is not None:
+                try:
+                    self.error_log_file.close()
+                except Exception as e:
+                    print(f"Error closing error log: {e}")
+                self.error_log_file = None
 
     def backup_configuration(self):
         """Backs up all files from the selected USB drive except the 'PPython' folder and exports requirements.txt to the backup location."""
@@ -811,58 +1278,18 @@ class MainWindow(QMainWindow):
             self.package_output_panel.clear()
             self.package_output_panel.appendPlainText("Starting backup process...")
             self.start_progress()
-            QApplication.processEvents()
-
-            for item in os.listdir(self.usb_drive):
-                if item.lower() == "ppython":
-                    self.package_output_panel.appendPlainText(f"Skipped 'PPython' folder: {item}")
-                    QApplication.processEvents()
-                    continue
-
-                source = os.path.join(self.usb_drive, item)
-                destination = os.path.join(backup_folder, item)
-
-                if is_hidden_or_system(source):
-                    self.package_output_panel.appendPlainText(f"Skipped hidden or system file/folder: {item}")
-                    QApplication.processEvents()
-                    continue
 
-                try:
-                    if os.path.isdir(source):
-                        shutil.copytree(source, destination, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(source, destination)
-                    self.package_output_panel.appendPlainText(f"Backed up {item} successfully.")
-                except Exception as copy_error:
-                    self.package_output_panel.appendPlainText(f"Failed to back up {item}: {copy_error}")
-                    self.log_error(f"Failed to back up {item}: {copy_error}", panel='package')
-                
-                self.package_output_panel.verticalScrollBar().setValue(
-                    self.package_output_panel.verticalScrollBar().maximum()
-                )
-                QApplication.processEvents()
-
-            # Export requirements.txt
-            self.package_output_panel.appendPlainText("Exporting requirements.txt...")
-            try:
-                list_command = [self.python_executable, "-m", "pip", "freeze"]
-                result = subprocess.run(list_command, capture_output=True, text=True, check=True)
-                requirements_path = os.path.join(backup_folder, "requirements.txt")
-                with open(requirements_path, 'w') as req_file:
-                    req_file.write(result.stdout)
-                self.package_output_panel.appendPlainText(f"requirements.txt exported to {requirements_path}")
-            except subprocess.CalledProcessError as e:
-                self.package_output_panel.appendPlainText("Failed to export requirements.txt.")
-                self.package_output_panel.appendPlainText(e.stderr)
-                self.log_error(f"Failed to export requirements.txt: {e.stderr}", panel='package')
-
-            self.package_output_panel.appendPlainText("Backup completed successfully.")
+            # The copy runs on a worker thread; its signals update the panel from the UI thread
+            self.backup_thread = BackupThread(self.usb_drive, backup_folder, self.python_executable)
+            self.backup_thread.log_signal.connect(self.package_output_panel.write)
+            self.backup_thread.error_signal.connect(lambda message: self.log_error(message, panel='package'))
+            self.backup_thread.finished.connect(self.stop_progress)
+            self.backup_thread.start()
 
         except Exception as e:
             error_message = f"Backup failed: {traceback.format_exc()}"
             self.package_output_panel.appendPlainText(error_message)
             self.log_error(error_message, panel='package')  # Specify the package panel
-        finally:
             self.stop_progress()
 
     def toggle_dark_mode(self):
@@ -873,52 +1300,18 @@ class MainWindow(QMainWindow):
         self.apply_theme()
 
     def apply_theme(self):
-        if self.theme == "Modern":
-            self.setStyleSheet("""
-                QMainWindow { background-color: #F5F5F5; color: #333333; }
-                QTabWidget::pane { border: 1px solid #CCCCCC; background-color: #FFFFFF; }
-                QTabBar::tab { background: #E0E0E0; color: #333333; padding: 10px; margin: 2px; }
-                QTabBar::tab:selected { background: #FFFFFF; border-bottom: 2px solid #0078D7; }
-                QPushButton { background-color: #0078D7; color: #FFFFFF; border: none; padding: 5px 10px; border-radius: 4px; }
-                QPushButton:hover { background-color: #005A9E; }
-                QLineEdit, QPlainTextEdit { background-color: #FFFFFF; color: #333333; border: 1px solid #CCCCCC; border-radius: 4px; }
-            """)
-            self.code_editor.set_theme("Modern")
-            self.output_panel.setStyleSheet("""
-                background-color: #FFFFFF;
-                color: #333333;
-                border: 1px solid #CCCCCC;
-                padding: 5px;
-            """)
-            self.package_output_panel.setStyleSheet("""
-                background-color: #FFFFFF;
-                color: #333333;
-                border: 1px solid #CCCCCC;
-                padding: 5px;
-            """)
-        elif self.theme == "Dark":
-            self.setStyleSheet("""
-                QMainWindow { background-color: #2B2B2B; color: #FFFFFF; }
-                QTabWidget::pane { border: 1px solid #444444; background-color: #3C3C3C; }
-                QTabBar::tab { background: #444444; color: #FFFFFF; padding: 10px; margin: 2px; }
-                QTabBar::tab:selected { background: #3C3C3C; border-bottom: 2px solid #6A6A6A; }
-                QPushButton { background-color: #555555; color: #FFFFFF; border: none; padding: 5px 10px; border-radius: 4px; }
-                QPushButton:hover { background-color: #666666; }
-                QLineEdit, QPlainTextEdit { background-color: #3C3C3C; color: #FFFFFF; border: 1px solid #444444; border-radius: 4px; }
-            """)
-            self.code_editor.set_theme("Dark")
-            self.output_panel.setStyleSheet("""
-                background-color: #333333;
-                color: #FFFFFF;
-                border: 1px solid #444444;
-                padding: 5px;
-            """)
-            self.package_output_panel.setStyleSheet("""
-                background-color: #333333;
-                color: #FFFFFF;
-                border: 1px solid #444444;
-                padding: 5px;
-            """)
+        # Re-applying identical stylesheets makes Qt re-parse them and restyle every child widget
+        if getattr(self, "applied_theme", None) == self.theme:
+            return
+        if self.theme not in THEME_STYLESHEETS:
+            return
+
+        main_qss, panel_qss = THEME_STYLESHEETS[self.theme]
+        self.setStyleSheet(main_qss)
+        self.code_editor.set_theme(self.theme)
+        self.output_panel.setStyleSheet(panel_qss)
+        self.package_output_panel.setStyleSheet(panel_qss)
+        self.applied_theme = self.theme
 
     def save_code(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Script", self.project_scripts_folder,
@@ -927,7 +1320,7 @@ class MainWindow(QMainWindow):
             if not file_path.endswith('.pyw'):
                 file_path += '.pyw'
             try:
-                with open(file_path, 'w') as file:
+                with open(file_path, 'w', buffering=WRITE_BUFFER_SIZE) as file:
                     code = self.code_editor.toPlainText()
                     file.write(code)
                 self.output_panel.appendPlainText(f"Script saved to {file_path}")
@@ -969,7 +1362,7 @@ class MainWindow(QMainWindow):
                 self.output_panel.appendPlainText(f"Loaded script from {file_path}")
 
                 # Check and install missing packages before running
-                threading.Thread(target=lambda: self.check_and_install_missing_packages(code)).start()
+                self.start_task(self.check_and_install_missing_packages, code)
 
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to load script: {e}")
@@ -988,129 +1381,184 @@ class MainWindow(QMainWindow):
             def task():
                 try:
                     self.start_progress()
-                    self.output_panel.clear()  # Clear the Code Editor output panel
-                    self.output_panel.appendPlainText(f"Running the following code:\n\n{code}\n\n")
 
                     # Check and install missing packages
                     self.check_and_install_missing_packages(code)
 
                     # Wait for all install threads to finish
-                    for thread in self.install_threads:
+                    for thread in list(self.install_threads):
                         thread.wait()
-                    self.install_threads.clear()
 
-                    self.output_panel.appendPlainText("\nAll missing packages installed. Executing the code...\n")
+                    self.output_line_signal.emit("\nAll missing packages installed. Executing the code...\n", False)
 
                     # Execute the code after ensuring all packages are installed
                     self.execute_code(code)
 
                 except Exception as e:
                     error_message = f"Run Code Error: {str(e)}\n{traceback.format_exc()}"
-                    self.output_panel.appendPlainText(error_message)
+                    self.output_line_signal.emit(error_message, False)
                     self.log_error(error_message, panel='editor')  # Direct to editor's output panel
                 finally:
                     self.stop_progress()
 
-            threading.Thread(target=task).start()
+            self.output_panel.clear()  # Clear the Code Editor output panel
+            self.output_panel.appendPlainText(f"Running the following code:\n\n{code}\n\n")
+            self.start_task(task)
         else:
             self.output_panel.appendPlainText("No code to execute.")
 
     def execute_code(self, code):
-        """Executes the provided code in a temporary file with improved error reporting."""
+        """
+        Executes the provided code from a reusable scratch file with improved error reporting. Runs on a worker
+        thread, so everything shown goes through the queued signals and stays in order with the script output.
+        """
         try:
-            # Create a temporary file to save the code for execution
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.pyw', delete=False) as tmp_file:
+            # Overwrite the same scratch file on every run instead of creating and deleting a new one
+            temp_script_path = self.get_scratch_script_path()
+            with open(temp_script_path, 'w', buffering=WRITE_BUFFER_SIZE) as tmp_file:
                 tmp_file.write(code)
-                temp_script_path = tmp_file.name
 
-            self.output_panel.appendPlainText(f"Temporary script created at {temp_script_path}\n")
-            self.output_panel.appendPlainText("Executing code...\n")
+            self.output_line_signal.emit(f"Temporary script created at {temp_script_path}\n\nExecuting code...\n", False)
 
-            # Start a subprocess to run the script and capture both stdout and stderr
+            # Start a subprocess to run the script; register it so Stop Script can terminate it.
+            # Unbuffered so print() output reaches the panel as it happens, and UTF-8 to match the decoding
+            # below instead of the ANSI code page Windows uses for pipes
             process = subprocess.Popen(
-                [self.python_executable, temp_script_path],
+                [self.python_executable, "-u", temp_script_path],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                bufsize=-1,
+                env={**os.environ, "PYTHONUNBUFFERED": "1", "PYTHONIOENCODING": "utf-8"},
+                creationflags=SUBPROCESS_CREATION_FLAGS
             )
-
-            stdout, stderr = process.communicate()
-
-            # Display the standard output (if any)
-            if stdout:
-                self.output_panel.appendPlainText(stdout)
+            self.active_process = process
+
+            # Drain stderr in the background so a chatty script cannot block on a full pipe,
+            # while stdout is streamed to the output panel as it arrives
+            stderr_chunks = []
+            stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+            stderr_reader.start()
+            self.read_process_output(process.stdout)
+            stderr_reader.join()
+            process.wait()
+            if self.active_process is process:
+                self.active_process = None
+            stderr = b"".join(stderr_chunks).decode(errors='replace')
 
             # Parse the error output (stderr) for better insights
             if stderr:
-                self.output_panel.appendHtml(f"<span style='color: red;'>Error:</span><br>")
-                error_lines = stderr.splitlines()
+                # Build the whole error report first so the panel lays out rich text only once
+                html_chunks = ["<span style='color: red;'>Error:</span><br>"]
 
                 # Highlight and display each line of the error with suggestions
-                for line in error_lines:
+                for line in stderr.splitlines():
+                    escaped_line = html.escape(line)
                     if "NameError" in line:
-                        self.output_panel.appendHtml(f"<span style='color: red;'>{line}</span><br>")
+                        html_chunks.append(f"<span style='color: red;'>{escaped_line}</span><br>")
                         if "not defined" in line:
                             suggestion = self.provide_error_suggestion(line)
                             if suggestion:
-                                self.output_panel.appendHtml(f"<span style='color: orange;'>Suggestion: {suggestion}</span><br>")
+                                html_chunks.append(f"<span style='color: orange;'>Suggestion: {html.escape(suggestion)}</span><br>")
                     else:
-                        self.output_panel.appendHtml(f"{line}<br>")
+                        html_chunks.append(f"{escaped_line}<br>")
 
                 # Display the full traceback if available
-                self.output_panel.appendHtml("\nFull traceback:\n")
-                self.output_panel.appendHtml(f"<pre style='color: red;'>{traceback.format_exc()}</pre>")
+                html_chunks.append("<br>Full traceback:<br>")
+                html_chunks.append(f"<pre style='color: red;'>{html.escape(traceback.format_exc())}</pre>")
+                self.output_html_signal.emit("".join(html_chunks))
 
             # Check the return code to determine if execution was successful
             if process.returncode != 0:
-                self.output_panel.appendHtml("<span style='color: red;'>Script execution failed with errors.</span>")
+                self.output_html_signal.emit("<span style='color: red;'>Script execution failed with errors.</span>")
             else:
-                self.output_panel.appendPlainText("Script executed successfully.")
+                self.output_line_signal.emit("Script executed successfully.", False)
 
         except Exception as e:
             # Capture and display detailed traceback if code execution fails
             error_message = f"Error executing code: {str(e)}\n{traceback.format_exc()}"
-            self.output_panel.appendHtml(f"<span style='color: red;'>{error_message}</span>")
+            self.output_html_signal.emit(f"<span style='color: red;'>{error_message}</span>")
             self.log_error(error_message, panel='editor')
 
-        finally:
-            # Clean up the temporary script file
-            if os.path.exists(temp_script_path):
-                try:
-                    os.remove(temp_script_path)
-                except Exception as cleanup_error:
-                    self.output_panel.appendPlainText(f"Failed to remove temporary file: {cleanup_error}")
+    def get_scratch_script_path(self, purpose="run", suffix=".pyw"):
+        """
+        Returns this window's scratch file for purpose, creating it with mkstemp on first use. The file is
+        overwritten on later runs; a unique name keeps other windows and users from sharing or planting it.
+        """
+        path = self.scratch_script_paths.get(purpose)
+        if path is None or not os.path.exists(path):
+            import tempfile
+
+            fd, path = tempfile.mkstemp(prefix=f"ppython_{purpose}_", suffix=suffix)
+            os.close(fd)
+            self.scratch_script_paths[purpose] = path
+        return path
+
+    def remove_scratch_scripts(self):
+        """Deletes the scratch files created by this window."""
+        for path in self.scratch_script_paths.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.scratch_script_paths.clear()
 
     def provide_error_suggestion(self, error_line):
         """Provides suggestions based on the error line."""
-        suggestions = {
-            "FirewallManagementTab": "Did you mean 'ServiceManagementTab'? Check if the class is defined or imported correctly.",
-            "SystemAdminToolkit": "Ensure 'SystemAdminToolkit' class is defined or imported in your script.",
-        }
-        
-        for key, suggestion in suggestions.items():
-            if key in error_line:
-                return suggestion
-        return None
+        match = ERROR_SUGGESTION_RE.search(error_line)
+        return ERROR_SUGGESTIONS[match.group(0)] if match else None
 
 
 
 
     def read_process_output(self, pipe, is_error=False):
-        """Reads output from a process pipe and updates the output panel in real time, with optional error styling."""
-        for line in io.TextIOWrapper(pipe, encoding="utf-8"):
-            self.update_output_panel(line.strip(), is_error=is_error)
+        """
+        Reads output from a process pipe on a background thread and hands it to the output panel in
+        batches through a queued signal, with optional error styling.
+        """
+        # Script output is shown as printed; only the line endings are removed
+        for lines in read_process_batches(pipe, strip=False):
+            self.output_line_signal.emit("\n".join(lines), is_error)
+
+    def start_task(self, function, *args):
+        """Runs function(*args) on the shared thread pool and returns its runnable."""
+        runnable = TaskRunnable(function, *args, on_error=lambda message: self.log_error(message, panel='editor'))
+        self.thread_pool.start(runnable)
+        return runnable
 
-    def update_output_panel(self, line, is_error=False):
-        """Adds a new line to the output panel with optional color for errors, auto-scrolls to the end."""
+    def run_streamed_command(self, command, emit):
+        """
+        Runs a command and passes its combined stdout/stderr to emit in batches as it arrives.
+        Returns the command's exit code.
+        """
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, creationflags=SUBPROCESS_CREATION_FLAGS)
+        for lines in read_process_batches(process.stdout):
+            emit("\n".join(lines))
+        process.stdout.close()
+        return process.wait()
+
+    def update_output_panel(self, text, is_error=False):
+        """Adds one or more lines to the output panel with optional color for errors, auto-scrolls to the end."""
         if is_error:
             # Format errors in red for easier identification
-            self.output_panel.appendHtml(f"<span style='color: red;'>{line.strip()}</span>")
+            lines = "<br>".join(html.escape(line.strip()) for line in text.splitlines())
+            self.output_panel.appendHtml(f"<span style='color: red;'>{lines}</span>")
         else:
-            self.output_panel.appendPlainText(line.strip())
+            self.output_panel.appendPlainText(text)
+        self.output_panel.moveCursor(QTextCursor.End)
+        self.output_panel.ensureCursorVisible()
+
+    def update_output_panel_html(self, html_text):
+        """Adds rich text (error reports) to the output panel and auto-scrolls to the end."""
+        self.output_panel.appendHtml(html_text)
         self.output_panel.moveCursor(QTextCursor.End)
         self.output_panel.ensureCursorVisible()
 
     def stop_script(self):
+        # End the debugger session, if one is running
+        if self.is_debugger_running():
+            self.debug_process.kill()
+            self.output_panel.appendPlainText("\nDebugger terminated.")
+
         # Attempt to terminate the active subprocess, if any
         if self.active_process and self.active_process.poll() is None:
             try:
@@ -1136,53 +1584,128 @@ class MainWindow(QMainWindow):
         """
         Parses the code to find all top-level imported packages using AST.
         """
+        import ast  # Deferred: only needed once a script is run or loaded
+
+        # Loading and then running the same buffer should not parse it twice
+        cached_code, cached_packages = self.imports_cache
+        if code == cached_code:
+            return list(cached_packages)
+
         packages = set()
         try:
             tree = ast.parse(code)
-            for node in ast.walk(tree):
+            # Imports are statements, so only statement lists need visiting; expressions are skipped
+            stack = list(tree.body)
+            while stack:
+                node = stack.pop()
                 if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        package = alias.name.split('.')[0]
-                        packages.add(package)
+                    packages.update(alias.name.partition('.')[0] for alias in node.names)
                 elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        package = node.module.split('.')[0]
-                        packages.add(package)
-        except SyntaxError as e:
+                    if node.module and not node.level:  # Relative imports refer to local modules
+                        packages.add(node.module.partition('.')[0])
+                else:
+                    for field in ('body', 'orelse', 'finalbody', 'handlers', 'cases'):
+                        stack.extend(getattr(node, field, None) or ())
+            self.imports_cache = (code, list(packages))
+        except (SyntaxError, ValueError) as e:  # ValueError: source contains null bytes
             # **Changed**: Directing errors from Code Editor to output_panel
-            self.output_panel.appendPlainText(f"Syntax error while parsing imports: {e}")
+            self.output_line_signal.emit(f"Syntax error while parsing imports: {e}", False)
             logging.error(f"Syntax error while parsing imports: {e}")
         return list(packages)
 
     def is_package_installed(self, package_name):
         """
-        Checks if a package is installed by attempting to import it.
+        Checks if a package is installed by locating its module spec, without importing it.
+        Positive results are cached; missing packages are re-checked since they may be installed later.
         """
-        try:
-            importlib.import_module(package_name)
+        if package_name in self.installed_packages_cache:
             return True
-        except ImportError:
-            return False
+        try:
+            installed = importlib.util.find_spec(package_name) is not None
+        except (ImportError, ValueError):
+            installed = False
+        if installed:
+            self.installed_packages_cache.add(package_name)
+        return installed
 
     def check_and_install_missing_packages(self, code):
-        """Identifies and installs missing packages, updating the output panel."""
+        """
+        Identifies and installs missing packages, updating the output panel. Runs on a pool thread, so
+        messages go through the queued signals.
+        """
+        self.prune_install_threads()  # finished can arrive before isFinished() is true; catch any left over
+        # Loading a file and then running it checks the same code twice; skip the repeat
+        code_hash = hashlib.blake2b(code.encode('utf-8', 'ignore'), digest_size=16).digest()
+        if code_hash == self._last_checked_code_hash:
+            self.output_line_signal.emit("Package requirements unchanged since the last check.", False)
+            return
+
         imported_packages = self.extract_imported_packages(code)
         missing_packages = [pkg for pkg in imported_packages if not self.is_package_installed(pkg)]
+        # Record the check before any install starts; a failing install clears it again from the GUI thread
+        self._last_checked_code_hash = code_hash
 
         if missing_packages:
-            self.output_panel.appendPlainText(f"Detected missing packages: {missing_packages}")
-            self.package_output_panel.appendPlainText(f"Installing missing packages: {missing_packages}\n")
-
-            # Start threads for each missing package installation
-            for package in missing_packages:
-                pypi_package = self.get_pypi_package_name(package)
-                install_thread = InstallPackageThread(pypi_package, self.python_executable)
-                install_thread.progress_signal.connect(self.handle_install_output)
-                install_thread.error_signal.connect(self.handle_install_error)
-                self.install_threads.append(install_thread)  # Store the thread reference
-                install_thread.start()
+            self.output_line_signal.emit(f"Detected missing packages: {missing_packages}", False)
+            self.package_output_signal.emit(f"Installing missing packages: {missing_packages}\n")
+
+            # Install everything with one pip run so the resolver solves all packages together
+            pypi_packages = [self.get_pypi_package_name(package) for package in missing_packages]
+            install_thread = PipCommandThread(
+                pip_command(self.python_executable, "install", *pypi_packages),
+                f"install {', '.join(pypi_packages)}",
+                # Some imports may be local modules with no PyPI package; pip then installs nothing at all
+                retry_commands=[
+                    (pip_command(self.python_executable, "install", package), f"install {package}")
+                    for package in pypi_packages
+                ] if len(pypi_packages) > 1 else None
+            )
+            install_thread.progress_signal.connect(self.handle_install_output)
+            install_thread.error_signal.connect(self.handle_install_error)
+            install_thread.skip_signal.connect(self.handle_install_skip)
+            # A failed install should be retried the next time the same code is checked
+            install_thread.completed_signal.connect(self.handle_missing_install_completed)
+            install_thread.completed_signal.connect(self.invalidate_package_caches)
+            self.track_install_thread(install_thread)
+            install_thread.start()
         else:
-            self.output_panel.appendPlainText("All required packages are already installed.")
+            self.output_line_signal.emit("All required packages are already installed.", False)
+
+    def handle_missing_install_completed(self, returncode):
+        """Forgets the last checked code after a failed install so the next check retries it."""
+        if returncode != 0:
+            self._last_checked_code_hash = None
+
+    def invalidate_package_caches(self, *args):
+        """Forgets the cached package listings after pip has changed the installed packages."""
+        self.installed_distributions_cache = None
+        self.requirements_cache = None
+
+    def track_install_thread(self, thread):
+        """Keeps a reference to an install thread so closing the window can cancel and wait for it."""
+        # Drop the reference once the install is done so the list only holds running threads. This may run on
+        # a pool thread without an event loop, so the slot must be a method of the GUI-thread window
+        thread.finished.connect(self.prune_install_threads)
+        with self.install_threads_lock:
+            self.install_threads.append(thread)
+
+    def prune_install_threads(self):
+        """
+        Forgets install threads that have finished. Python then frees them; deleteLater would never run for
+        threads created on a pool thread, since that thread has no event loop.
+        """
+        with self.install_threads_lock:
+            self.install_threads = [thread for thread in self.install_threads if not thread.isFinished()]
+
+    def cancel_install_threads(self):
+        """Stops every pending package installation and waits for the threads to exit."""
+        with self.install_threads_lock:
+            threads = list(self.install_threads)
+        for thread in threads:
+            thread.cancel()
+        # Destroying a QThread that is still running aborts the application
+        for thread in threads:
+            thread.wait()
 
     def install_package(self, package_name, async_install=True, target_panel="main"):
         if package_name.strip() and self.python_executable:
@@ -1190,9 +1713,15 @@ class MainWindow(QMainWindow):
 
             if async_install:
                 # Use a thread for asynchronous installation
-                self.install_thread = InstallThread(self.python_executable, package_name)
-                self.install_thread.package_installed_signal.connect(lambda line: output_panel.appendPlainText(line))
+                self.install_thread = PipCommandThread(
+                    pip_command(self.python_executable, "install", package_name),
+                    f"install {package_name}"
+                )
+                self.install_thread.progress_signal.connect(output_panel.appendPlainText)
+                self.install_thread.skip_signal.connect(lambda error: output_panel.appendPlainText(f"Error: {error}"))
                 self.install_thread.error_signal.connect(lambda error: output_panel.appendPlainText(f"Error: {error}"))
+                self.install_thread.completed_signal.connect(self.invalidate_package_caches)
+                self.track_install_thread(self.install_thread)
                 
                 # Start the thread
                 output_panel.appendPlainText(f"\nInstalling {package_name} asynchronously...\n")
@@ -1201,25 +1730,35 @@ class MainWindow(QMainWindow):
                 # Synchronous installation
                 try:
                     output_panel.appendPlainText(f"\nInstalling {package_name} synchronously...\n")
-                    install_command = [self.python_executable, "-m", "pip", "install", package_name]
-                    result = subprocess.run(install_command, capture_output=True, text=True)
-                    output_panel.appendPlainText(result.stdout)
+                    install_command = pip_command(self.python_executable, "install", package_name)
+                    result = subprocess.run(install_command, capture_output=True, text=True, creationflags=SUBPROCESS_CREATION_FLAGS)
+                    self.invalidate_package_caches()
+                    # Collect pip's output and the outcome so the panel lays out the text once
+                    messages = [result.stdout]
                     if result.stderr:
-                        output_panel.appendPlainText(f"Error: {result.stderr}")
+                        messages.append(f"Error: {result.stderr}")
                     if result.returncode == 0:
-                        output_panel.appendPlainText(f"{package_name} installed successfully.\n")
+                        messages.append(f"{package_name} installed successfully.\n")
                     else:
-                        output_panel.appendPlainText(f"Failed to install {package_name}.\n")
+                        messages.append(f"Failed to install {package_name}.\n")
+                    output_panel.appendPlainText("\n".join(messages))
                 except Exception as e:
                     output_panel.appendPlainText(f"Error installing {package_name}: {str(e)}")
         else:
             output_panel.appendPlainText("Please enter a valid package name or set the Python executable.\n")
 
-    def install_requirements(self, requirements_path, existing_packages):
-        self.requirements_thread = InstallRequirementsThread(requirements_path, existing_packages)
+    def install_requirements(self, requirements_path, existing_packages=None, on_completed=None):
+        self.requirements_thread = PipCommandThread(
+            pip_command(self.python_executable, "install", "-r", requirements_path),
+            f"install requirements from {requirements_path}"
+        )
         self.requirements_thread.progress_signal.connect(self.handle_progress_output)
         self.requirements_thread.error_signal.connect(self.handle_install_error)
         self.requirements_thread.skip_signal.connect(self.handle_install_skip)
+        self.requirements_thread.completed_signal.connect(self.invalidate_package_caches)
+        if on_completed:
+            self.requirements_thread.completed_signal.connect(on_completed)
+        self.track_install_thread(self.requirements_thread)
         self.requirements_thread.start()
 
     def handle_progress_output(self, message):
@@ -1233,124 +1772,126 @@ class MainWindow(QMainWindow):
         Handles output messages from installation threads and updates the output panel.
         """
         self.package_output_panel.appendPlainText(message)
-        QApplication.processEvents()  # Ensure real-time update in output panel
 
     def handle_install_error(self, error_message):
         """Logs and displays error messages in the package maintenance output panel."""
         self.package_output_panel.appendPlainText(error_message)  # Display error in maintenance tab
         self.log_error(error_message, panel='package')  # Log to maintenance tab
         logging.error(error_message)
-        QApplication.processEvents()  # Update the UI with the new error message
 
     def list_installed_packages(self):
         """
-        Lists installed packages using 'pip list' command.
+        Lists the packages installed in the IDE's interpreter, in the same layout as 'pip list'.
         """
         def task():
             self.start_progress()
             try:
-                self.package_output_panel.clear()
-                self.package_output_panel.appendPlainText("Retrieving packages with 'pip list'...\n")
-                list_command = [sys.executable, "-m", "pip", "list"]
-                result = subprocess.run(list_command, capture_output=True, text=True)
-                self.package_output_panel.appendPlainText(result.stdout)
-                if result.stderr:
-                    self.package_output_panel.appendPlainText(result.stderr)
+                self.package_output_signal.emit("Retrieving installed packages...\n")
+                # Read package metadata in-process; 'pip list' would start a second interpreter
+                distributions = list_installed_distributions()
+                name_width = max([len("Package")] + [len(name) for name, _ in distributions])
+                version_width = max([len("Version")] + [len(version) for _, version in distributions])
+                rows = [f"{'Package':<{name_width}} Version", f"{'-' * name_width} {'-' * version_width}"]
+                rows.extend(f"{name:<{name_width}} {version}" for name, version in distributions)
+                self.package_output_signal.emit("\n".join(rows))
 
             except Exception as e:
-                self.package_output_panel.appendPlainText(f"Failed to list packages: {e}")
+                self.package_output_signal.emit(f"Failed to list packages: {e}")
             finally:
                 self.stop_progress()
 
-        threading.Thread(target=task).start()
+        self.package_output_panel.clear()
+        self.start_task(task)
 
     def upgrade_packages(self):
         """
-        Retrieves a list of outdated packages and upgrades each one individually if necessary.
+        Retrieves a list of outdated packages and upgrades them together, one at a time only if that fails.
         """
         def task():
             self.start_progress()
             try:
-                self.package_output_panel.clear()
-                self.package_output_panel.appendPlainText("Retrieving list of outdated packages...\n")
+                self.package_output_signal.emit("Retrieving list of outdated packages...\n")
 
                 # Step 1: Retrieve outdated packages with 'pip list --outdated'
-                list_outdated_command = [sys.executable, "-m", "pip", "list", "--outdated", "--format=json"]
-                result = subprocess.run(list_outdated_command, capture_output=True, text=True)
+                list_outdated_command = pip_command(sys.executable, "list", "--outdated", "--format=json")
+                result = subprocess.run(list_outdated_command, capture_output=True, text=True, creationflags=SUBPROCESS_CREATION_FLAGS)
                 
                 if result.returncode != 0:
-                    self.package_output_panel.appendPlainText("Failed to retrieve list of outdated packages.\n")
+                    self.package_output_signal.emit("Failed to retrieve list of outdated packages.\n")
                     return
 
                 # Parse the JSON output to get the list of outdated packages
                 try:
                     outdated_packages = json.loads(result.stdout)
                 except json.JSONDecodeError:
-                    self.package_output_panel.appendPlainText("Error decoding output from 'pip list --outdated'.\n")
+                    self.package_output_signal.emit("Error decoding output from 'pip list --outdated'.\n")
                     return
 
                 if not outdated_packages:
-                    self.package_output_panel.appendPlainText("No outdated packages found.\n")
+                    self.package_output_signal.emit("No outdated packages found.\n")
                     return
 
-                # Step 2: Upgrade each outdated package
+                # Step 2: Upgrade every outdated package with a single pip run, streaming its output
+                latest_versions = {package_info['name']: package_info['latest_version'] for package_info in outdated_packages}
+                package_names = list(latest_versions)
+                self.package_output_signal.emit(f"Upgrading {', '.join(package_names)}...\n")
+                upgrade_command = pip_command(sys.executable, "install", "--upgrade", *package_names)
+                returncode = self.run_streamed_command(upgrade_command, self.package_output_signal.emit)
+
                 failed_packages = []
-                for package_info in outdated_packages:
-                    package_name = package_info['name']
-                    self.package_output_panel.appendPlainText(f"Upgrading {package_name}...\n")
-
-                    # Upgrade command for the individual package
-                    upgrade_command = [sys.executable, "-m", "pip", "install", "--upgrade", package_name]
-                    upgrade_result = subprocess.run(upgrade_command, capture_output=True, text=True)
-
-                    if upgrade_result.returncode == 0:
-                        # Confirm the upgraded version
-                        version_command = [sys.executable, "-m", "pip", "show", package_name]
-                        version_result = subprocess.run(version_command, capture_output=True, text=True)
-                        new_version = "unknown"
-                        for line in version_result.stdout.splitlines():
-                            if line.startswith("Version:"):
-                                new_version = line.split("Version: ")[-1]
-                        self.package_output_panel.appendPlainText(f"{package_name} upgraded to version: {new_version}\n")
-                    else:
-                        failed_packages.append(package_name)
-                        self.package_output_panel.appendPlainText(f"Failed to upgrade {package_name}: {upgrade_result.stderr}\n")
+                if returncode == 0:
+                    # The version pip installed is the latest_version it reported as outdated
+                    self.package_output_signal.emit("\n".join(
+                        f"{package_name} upgraded to version: {new_version}\n"
+                        for package_name, new_version in latest_versions.items()
+                    ))
+                else:
+                    # One conflicting package fails the whole run; retry individually to upgrade the rest
+                    self.package_output_signal.emit("Batch upgrade failed, upgrading packages one at a time...\n")
+                    for package_name, new_version in latest_versions.items():
+                        upgrade_command = pip_command(sys.executable, "install", "--upgrade", package_name)
+                        upgrade_result = subprocess.run(upgrade_command, capture_output=True, text=True, creationflags=SUBPROCESS_CREATION_FLAGS)
+                        if upgrade_result.returncode == 0:
+                            self.package_output_signal.emit(f"{package_name} upgraded to version: {new_version}\n")
+                        else:
+                            failed_packages.append(package_name)
+                            self.package_output_signal.emit(f"Failed to upgrade {package_name}: {upgrade_result.stderr}\n")
 
                 # Step 3: Summarize the results
                 if failed_packages:
-                    self.package_output_panel.appendPlainText(f"\nFailed to upgrade the following packages: {', '.join(failed_packages)}\n")
+                    self.package_output_signal.emit(f"\nFailed to upgrade the following packages: {', '.join(failed_packages)}\n")
                 else:
-                    self.package_output_panel.appendPlainText("All packages upgraded successfully.\n")
+                    self.package_output_signal.emit("All packages upgraded successfully.\n")
 
             except Exception as e:
-                self.package_output_panel.appendPlainText(f"Error during upgrade: {e}\n")
+                self.package_output_signal.emit(f"Error during upgrade: {e}\n")
             finally:
+                self.invalidate_package_caches()
                 self.stop_progress()
 
-        threading.Thread(target=task).start()
+        self.package_output_panel.clear()
+        self.start_task(task)
 
     def update_pip(self):
         def task():
             self.start_progress()
             try:
-                self.package_output_panel.appendPlainText("\nUpdating pip...\n")
-                update_command = [sys.executable, "-m", "pip", "install", "--upgrade", "pip"]
-                result = subprocess.run(update_command, capture_output=True, text=True)
-                self.package_output_panel.appendPlainText(result.stdout)
-                if result.stderr:
-                    self.package_output_panel.appendPlainText(result.stderr)
-                if result.returncode == 0:
-                    self.package_output_panel.appendPlainText("pip updated successfully.")
+                self.package_output_signal.emit("\nUpdating pip...\n")
+                update_command = pip_command(sys.executable, "install", "--upgrade", "pip")
+                returncode = self.run_streamed_command(update_command, self.package_output_signal.emit)
+                if returncode == 0:
+                    self.package_output_signal.emit("pip updated successfully.")
                 else:
-                    self.package_output_panel.appendPlainText("Failed to update pip.")
+                    self.package_output_signal.emit("Failed to update pip.")
             except subprocess.CalledProcessError as e:
-                self.package_output_panel.appendPlainText(f"Failed to update pip: {e}")
+                self.package_output_signal.emit(f"Failed to update pip: {e}")
             except Exception as e:
-                self.package_output_panel.appendPlainText(f"Failed to update pip: {e}")
+                self.package_output_signal.emit(f"Failed to update pip: {e}")
             finally:
+                self.invalidate_package_caches()
                 self.stop_progress()
 
-        threading.Thread(target=task).start()
+        self.start_task(task)
 
     def create_standalone_app(self):
         app_name, ok = QInputDialog.getText(self, "App Name", "Enter the name of the app:")
@@ -1380,58 +1921,47 @@ class MainWindow(QMainWindow):
             return
 
         def task():
+            # Status lines share the queued signal with the build output so they stay in order
+            emit_output = lambda text: self.output_line_signal.emit(text, False)
             self.start_progress()
             try:
-                self.output_panel.appendPlainText("\nChecking for PyInstaller...")
-
-                # Install PyInstaller if not already installed
-                install_command = [sys.executable, "-m", "pip", "install", "pyinstaller"]
-                install_result = subprocess.run(install_command, capture_output=True, text=True)
-                self.output_panel.appendPlainText(install_result.stdout)
-                if install_result.stderr:
-                    self.output_panel.appendPlainText(install_result.stderr)
-                if install_result.returncode != 0:
-                    self.output_panel.appendPlainText("Failed to install PyInstaller.")
-                    return
-
-                self.output_panel.appendPlainText(f"Creating standalone app '{app_name}'...")
+                emit_output(f"Creating standalone app '{app_name}'...")
                 
-                # Specify PyInstaller output paths to the selected output folder
+                # Keep PyInstaller's build files in a per-app cache outside the output folder, so rebuilding
+                # the same app reuses the import analysis instead of starting over
+                import tempfile
+                cache_folder = os.path.join(tempfile.gettempdir(), "ppython_pyinstaller_cache", app_name)
+
+                # Only the executable goes to the selected output folder; the bootstrap
+                # installs PyInstaller first if needed, so one interpreter does both steps
                 command = [
-                    sys.executable, "-m", "PyInstaller",
+                    sys.executable, "-c", PYINSTALLER_BOOTSTRAP,
                     "--distpath", app_folder,
-                    "--workpath", os.path.join(app_folder, "build"),
-                    "--specpath", os.path.join(app_folder, "spec"),
+                    "--workpath", os.path.join(cache_folder, "build"),
+                    "--specpath", cache_folder,
                     "--onefile", "--noconsole",
                     script_path
                 ]
                 
-                result = subprocess.run(command, capture_output=True, text=True)
-                self.output_panel.appendPlainText(result.stdout)
-                if result.stderr:
-                    self.output_panel.appendPlainText(result.stderr)
-
-                if result.returncode == 0:
-                    self.output_panel.appendPlainText("\nCleaning up unnecessary files...")
-                    shutil.rmtree(os.path.join(app_folder, "build"), ignore_errors=True)
-                    spec_file = os.path.join(app_folder, f"{app_name}.spec")
-                    if os.path.exists(spec_file):
-                        os.remove(spec_file)
-                        self.output_panel.appendPlainText(f"Removed spec file: {spec_file}")
+                # PyInstaller logs progress for every build step; show it as it happens
+                returncode = self.run_streamed_command(command, emit_output)
+                self.invalidate_package_caches()  # PyInstaller may have just been installed
+                if returncode == 0:
+                    emit_output("\nCleaning up unnecessary files...")
                     if os.path.exists(script_path):
                         os.remove(script_path)
-                        self.output_panel.appendPlainText(f"Removed script file: {script_path}")
-                    self.output_panel.appendPlainText(f"\nStandalone app '{app_name}' created successfully in {app_folder}")
+                        emit_output(f"Removed script file: {script_path}")
+                    emit_output(f"\nStandalone app '{app_name}' created successfully in {app_folder}")
                 else:
-                    self.output_panel.appendPlainText(f"Failed to create standalone app: {result.stderr}")
+                    emit_output("Failed to create standalone app. Check the output for details.")
             except subprocess.CalledProcessError as e:
-                self.output_panel.appendPlainText(f"Failed to create standalone app: {e}")
+                emit_output(f"Failed to create standalone app: {e}")
             except Exception as e:
-                self.output_panel.appendPlainText(f"Failed to create standalone app: {e}")
+                emit_output(f"Failed to create standalone app: {e}")
             finally:
                 self.stop_progress()
 
-        threading.Thread(target=task).start()
+        self.start_task(task)
 
     def show_documentation(self):
         doc_text = (
@@ -1480,23 +2010,34 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
 
     def closeEvent(self, event):
-        if self.active_process and self.active_process.poll() is None:
+        script_running = self.active_process and self.active_process.poll() is None
+        if script_running or self.is_debugger_running():
             reply = QMessageBox.question(self, 'Exit',
                                          "A script is still running. Do you want to terminate it and exit?",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
+                if self.is_debugger_running():
+                    self.debug_process.kill()
+                    self.debug_process.waitForFinished(1000)
                 try:
-                    self.active_process.terminate()
+                    if script_running:
+                        stop_process(self.active_process)
                     self.output_panel.appendPlainText("\nScript terminated by user during exit.")
                 except Exception as e:
                     self.output_panel.appendPlainText(f"\nFailed to terminate process during exit: {e}")
+                self.cancel_install_threads()
                 event.accept()
             else:
                 self.output_panel.appendPlainText("Exit cancelled; script is still running.")
                 event.ignore()
         else:
+            self.cancel_install_threads()
             event.accept()
 
+        if event.isAccepted():
+            self.remove_scratch_scripts()
+            self.close_error_log()
+
     def select_python_folder(self):
         """Select the Python installation folder and configure the Python environment based on the selection."""
         try:
@@ -1509,32 +2050,38 @@ class MainWindow(QMainWindow):
                 self.finalize_ui()
                 return
 
-            # Prompt user to select a Python folder
-            python_folder = QFileDialog.getExistingDirectory(self, "Select Python Installation Folder")
-            if python_folder:
+            # Prompt user to select a Python folder until a valid installation is chosen
+            while True:
+                python_folder = QFileDialog.getExistingDirectory(self, "Select Python Installation Folder")
+                if not python_folder:
+                    QMessageBox.critical(self, "Error", "No folder selected. The application will exit.")
+                    sys.exit(1)
+
                 python_executable = Path(python_folder) / "python.exe"
                 if python_executable.exists():
-                    # Save path and update environment variables
-                    save_python_path(python_folder)
-                    self.python_install_folder = python_folder
-                    self.python_executable = str(python_executable)
-                    self.pythonw_executable = str(Path(python_folder) / "pythonw.exe")
-                    os.environ['PYTHONHOME'] = str(python_executable.parent)
-                    os.environ['PYTHONPATH'] = str(python_executable.parent / 'Lib' / 'site-packages')
-                    print(f"Configured Python environment at {self.python_install_folder}")
-                    self.finalize_ui()
-                else:
-                    QMessageBox.critical(self, "Error", f"No 'python.exe' found in {python_folder}. Please select a valid Python installation.")
-                    self.select_python_folder()
-            else:
-                QMessageBox.critical(self, "Error", "No folder selected. The application will exit.")
-                sys.exit(1)
+                    break
+                QMessageBox.critical(self, "Error", f"No 'python.exe' found in {python_folder}. Please select a valid Python installation.")
+
+            # Save path and update environment variables
+            save_python_path(python_folder)
+            self.python_install_folder = python_folder
+            self.python_executable = str(python_executable)
+            self.pythonw_executable = str(Path(python_folder) / "pythonw.exe")
+            os.environ['PYTHONHOME'] = str(python_executable.parent)
+            os.environ['PYTHONPATH'] = str(python_executable.parent / 'Lib' / 'site-packages')
+            print(f"Configured Python environment at {self.python_install_folder}")
+            self.finalize_ui()
         except Exception as e:
             print(f"Error during Python folder selection: {e}")
 
     def perform_search(self):
         search_term = self.search_input.text()
-        if not self.code_editor.search_text(search_term):
+        found = self.code_editor.search_text(
+            search_term,
+            match_case=self.match_case_checkbox.isChecked(),
+            whole_word=self.whole_word_checkbox.isChecked()
+        )
+        if not found:
             QMessageBox.information(self, "Search", f"'{search_term}' not found.")
 
     def perform_replace(self):
@@ -1546,7 +2093,14 @@ class MainWindow(QMainWindow):
     def perform_replace_all(self):
         search_term = self.search_input.text()
         replace_text = self.replace_input.text()
-        self.code_editor.replace_all(search_term, replace_text)
+        count = self.code_editor.replace_all(
+            search_term,
+            replace_text,
+            match_case=self.match_case_checkbox.isChecked(),
+            whole_word=self.whole_word_checkbox.isChecked()
+        )
+        if not count:
+            QMessageBox.information(self, "Replace All", f"'{search_term}' not found.")
 
     def export_requirements_txt(self):
         """
@@ -1561,33 +2115,45 @@ class MainWindow(QMainWindow):
 
             requirements_path = os.path.join(ppython_folder, "requirements.txt")
             
-            # Fetch top-level installed packages using pip
-            list_command = [sys.executable, "-m", "pip", "list", "--not-required", "--format=freeze"]
-            result = subprocess.run(list_command, capture_output=True, text=True)
+            # Fetch top-level installed packages using pip, unless nothing was installed since the last export
+            if self.requirements_cache is None:
+                list_command = pip_command(sys.executable, "list", "--not-required", "--format=json")
+                result = subprocess.run(list_command, capture_output=True, text=True, creationflags=SUBPROCESS_CREATION_FLAGS)
 
-            if result.returncode != 0:
-                self.package_output_panel.appendPlainText("Failed to retrieve packages for requirements export.\n")
-                self.log_error(f"pip list failed with error: {result.stderr}", panel='package')
-                return
+                if result.returncode != 0:
+                    self.package_output_panel.appendPlainText("Failed to retrieve packages for requirements export.\n")
+                    self.log_error(f"pip list failed with error: {result.stderr}", panel='package')
+                    return
+
+                # Sort the requirements alphabetically for better readability; encode once, ending with a newline
+                packages = sorted(json.loads(result.stdout), key=lambda package: package["name"].lower())
+                self.requirements_cache = "".join(f"{package['name']}=={package['version']}\n" for package in packages).encode()
 
             # Check if any top-level packages are found
-            if not result.stdout.strip():
+            if not self.requirements_cache:
                 self.package_output_panel.appendPlainText("No top-level packages found to export.\n")
                 return
+            sorted_requirements = self.requirements_cache
 
-            # Sort the requirements alphabetically for better readability
-            sorted_requirements = "\n".join(sorted(result.stdout.strip().splitlines()))
-
-            # Save sorted requirements to the defined path
-            with open(requirements_path, 'w') as file:
-                file.write(sorted_requirements + "\n")  # Ensure the file ends with a newline
+            # Save sorted requirements to the defined path; write a temporary file next to it and swap it in,
+            # so an interrupted export never leaves a truncated requirements.txt on the drive
+            import tempfile
+            fd, temp_path = tempfile.mkstemp(dir=ppython_folder, prefix=".requirements-", suffix=".tmp")
+            try:
+                with open(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as file:
+                    file.write(sorted_requirements)
+                os.replace(temp_path, requirements_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
             self.package_output_panel.appendPlainText(f"Requirements saved to {requirements_path}\n")
 
             # Prompt user to save to an additional location, if desired
             file_path, _ = QFileDialog.getSaveFileName(self, "Save requirements.txt As", "", "Text Files (*.txt)")
             if file_path:
-                with open(file_path, 'w') as file:
-                    file.write(sorted_requirements + "\n")
+                import shutil
+                # Copy the file just written instead of serializing the listing a second time
+                shutil.copyfile(requirements_path, file_path)
                 self.package_output_panel.appendPlainText(f"Requirements also saved to: {file_path}\n")
 
         except Exception as e:
@@ -1605,51 +2171,33 @@ class MainWindow(QMainWindow):
             self.package_output_panel.appendPlainText("No requirements file selected.")
             return
 
-        try:
-            self.package_output_panel.appendPlainText(f"Importing packages from {file_path}...\n")
-            self.start_progress()
-            QApplication.processEvents()
-
-            # Execute pip install with requirements file
-            install_command = [self.python_executable, "-m", "pip", "install", "-r", file_path]
-            result = subprocess.run(install_command, capture_output=True, text=True)
-
-            # Display the output
-            if result.stdout:
-                self.package_output_panel.appendPlainText(result.stdout)
-            if result.stderr:
-                self.package_output_panel.appendPlainText(result.stderr)
-
-            if result.returncode == 0:
-                self.package_output_panel.appendPlainText("Packages installed successfully from requirements.txt.")
-            else:
-                self.package_output_panel.appendPlainText("Some packages failed to install. Check the output for details.")
-                self.log_error(f"Failed to install some packages from requirements.txt:\n{result.stderr}", panel='package')
+        if not self.python_executable:
+            self.package_output_panel.appendPlainText("Please set the Python executable before importing requirements.\n")
+            return
 
-        except Exception as e:
-            self.package_output_panel.appendPlainText(f"Failed to import requirements: {e}")
-            self.log_error(f"Failed to import requirements: {e}", panel='package')
-        finally:
-            self.stop_progress()
+        self.package_output_panel.appendPlainText(f"Importing packages from {file_path}...\n")
+        self.start_progress()
+        # Install on the pip worker thread so the window stays responsive and the output streams in
+        self.install_requirements(file_path, on_completed=self.handle_requirements_import_completed)
 
+    def handle_requirements_import_completed(self, returncode):
+        """Reports the result of import_requirements once pip has finished."""
+        if returncode == 0:
+            self.package_output_panel.appendPlainText("Packages installed successfully from requirements.txt.")
+        else:
+            self.package_output_panel.appendPlainText("Some packages failed to install. Check the output for details.")
+            details = "\n".join(self.requirements_thread.errors) or f"pip exited with code {returncode}"
+            self.log_error(f"Failed to install some packages from requirements.txt:\n{details}", panel='package')
+        self.stop_progress()
 
     def get_installed_packages(self):
         """
         Retrieves a set of names of all installed packages.
+        Read in-process with importlib.metadata and cached until pip installs or upgrades something.
         """
-        list_command = [sys.executable, "-m", "pip", "list", "--format=freeze"]
-        result = subprocess.run(list_command, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            self.package_output_panel.appendPlainText("Failed to retrieve installed packages.\n")
-            return set()
-
-        installed_packages = set()
-        for line in result.stdout.splitlines():
-            if "==" in line:
-                package_name = line.split("==")[0]
-                installed_packages.add(package_name.lower())
-        return installed_packages
+        if self.installed_distributions_cache is None:
+            self.installed_distributions_cache = {name.lower() for name, _ in list_installed_distributions()}
+        return set(self.installed_distributions_cache)
 
     def run_debugger(self):
         """Runs the code in the editor with pdb, allowing step-by-step debugging."""
@@ -1658,73 +2206,72 @@ class MainWindow(QMainWindow):
             self.output_panel.appendPlainText("No code to debug.")
             return
 
-        def debug_task():
-            self.start_progress()
-            self.output_panel.clear()
-            self.debug_console.clear()
-            self.output_panel.appendPlainText("Starting debugger...\n")
-
-            try:
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as tmp_file:
-                    tmp_file.write(code)
-                    temp_script_path = tmp_file.name
-
-                # Start pdb with the script
-                debug_command = [sys.executable, "-m", "pdb", temp_script_path]
-                self.active_process = subprocess.Popen(
-                    debug_command,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    bufsize=1
-                )
+        if self.is_debugger_running():
+            self.output_panel.appendPlainText("The debugger is already running. Stop the script before starting a new session.")
+            return
 
-                threading.Thread(target=self.read_debug_output, args=(self.active_process,)).start()
+        self.output_panel.clear()
+        self.debug_console.clear()
+        self.output_panel.appendPlainText("Starting debugger...\n")
 
-            except Exception as e:
-                error_message = f"Debugger error: {str(e)}\n{traceback.format_exc()}"
-                self.output_panel.appendPlainText(error_message)
-                self.log_error(error_message, panel='editor')  # Direct to editor's output panel
-            finally:
-                self.stop_progress()
+        try:
+            # Overwrite this window's debug scratch file each session instead of leaving a new temp file behind;
+            # it is separate from Run Code's so a debug session and a running script never share a file
+            temp_script_path = self.get_scratch_script_path("debug", ".py")
+            with open(temp_script_path, 'w', buffering=WRITE_BUFFER_SIZE) as tmp_file:
+                tmp_file.write(code)
 
-        self.active_thread = threading.Thread(target=debug_task)
-        self.active_thread.start()
-
-    def read_debug_output(self, process):
-        """Reads output from the pdb process and updates the output panel, handles input."""
-        def send_input():
-            while process.poll() is None:
-                if not self.command_in_progress:
-                    command = self.debug_console.toPlainText().strip()
-                    if command:
-                        self.command_in_progress = True
-                        try:
-                            process.stdin.write(command + "\n")
-                            process.stdin.flush()
-                            self.debug_console.clear()
-                            self.output_panel.appendPlainText(f"Sent command: {command}\n")
-                            QApplication.processEvents()
-                        except Exception as e:
-                            error_message = f"Failed to send command: {e}"
-                            self.output_panel.appendPlainText(f"{error_message}\n")
-                            self.log_error(error_message, panel='editor')
-                time.sleep(0.1)
-
-        threading.Thread(target=send_input).start()
+            # QProcess reports pdb's output and exit through the event loop, so no reader or writer threads are needed
+            self.debug_output_buffer = b''
+            self.debug_process = QProcess(self)
+            self.debug_process.setProcessChannelMode(QProcess.MergedChannels)
+            self.debug_process.readyReadStandardOutput.connect(self.handle_debug_output)
+            self.debug_process.finished.connect(self.handle_debug_finished)
+            self.debug_process.start(sys.executable, ["-m", "pdb", temp_script_path])
+            self.start_progress()
 
-        try:
-            for line in io.TextIOWrapper(process.stdout, encoding="utf-8"):
-                self.output_panel.appendPlainText(line.strip())
-                QApplication.processEvents()
-                if "(Pdb)" in line:
-                    self.command_in_progress = False  # Allow new command after prompt
         except Exception as e:
-            error_message = f"Error reading debugger output: {e}"
-            self.output_panel.appendPlainText(f"{error_message}\n")
-            self.log_error(error_message, panel='editor')
+            error_message = f"Debugger error: {str(e)}\n{traceback.format_exc()}"
+            self.output_panel.appendPlainText(error_message)
+            self.log_error(error_message, panel='editor')  # Direct to editor's output panel
 
+    def is_debugger_running(self):
+        return self.debug_process is not None and self.debug_process.state() != QProcess.NotRunning
+
+    def send_debug_command(self, command):
+        """Sends a command typed in the debug console to the running pdb session."""
+        if not self.is_debugger_running():
+            self.output_panel.appendPlainText("The debugger is not running. Start it with Run Debugger.")
+            return
+        self.debug_process.write(f"{command}\n".encode())
+        self.output_panel.appendPlainText(f"Sent command: {command}\n")
+
+    def handle_debug_output(self):
+        """Collects pdb output and shows everything up to the next prompt in a single append."""
+        self.debug_output_buffer += bytes(self.debug_process.readAllStandardOutput())
+        # The prompt is not followed by a newline; it means pdb is waiting, so show the output now
+        if self.debug_output_buffer.endswith(b'(Pdb) ') or len(self.debug_output_buffer) >= 8192:
+            self.flush_debug_output()
+        elif not self.debug_flush_timer.isActive():
+            self.debug_flush_timer.start()
+
+    def flush_debug_output(self, include_partial=False):
+        """Appends the buffered pdb output to the output panel, keeping back an unfinished last line."""
+        self.debug_flush_timer.stop()
+        if include_partial or self.debug_output_buffer.endswith(b'(Pdb) '):
+            text, self.debug_output_buffer = self.debug_output_buffer, b''
+        else:
+            text, _, self.debug_output_buffer = self.debug_output_buffer.rpartition(b'\n')
+        if text:
+            self.update_output_panel("\n".join(line.rstrip() for line in text.decode(errors='replace').split("\n")))
+
+    def handle_debug_finished(self, exit_code, exit_status):
+        """Flushes the last pdb output and releases the process once the session ends."""
+        self.flush_debug_output(include_partial=True)
+        self.output_panel.appendPlainText(f"Debugger exited with code {exit_code}.")
+        self.debug_process.deleteLater()
+        self.debug_process = None
+        self.stop_progress()
 
 
 if __name__ == "__main__":